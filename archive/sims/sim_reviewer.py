@@ -4,36 +4,170 @@ sim_reviewer.py — 模擬「複習者」使用者流程
 使用 Playwright (sync API) 執行瀏覽器自動化測試
 """
 
-import subprocess
-import sys
-import time
-import signal
+import functools
 import os
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from http.server import ThreadingHTTPServer, SimpleHTTPRequestHandler
 
-from playwright.sync_api import sync_playwright, TimeoutError as PWTimeout
+from playwright.sync_api import sync_playwright, expect, TimeoutError as PWTimeout
 
 # ── 全域設定 ──────────────────────────────────────────
-BASE_URL = "http://localhost:8767"
+PORT = 8767
+SERVER_POLL_INTERVAL = 0.05
+# 本機靜態檔案，導覽超過 5 秒即視為失敗
+NAV_TIMEOUT = 5000
+BASE_URL = f"http://127.0.0.1:{PORT}"
 PAGE_PATH = "/資訊管理學系/資訊管理學系考古題總覽.html"
 PAGE_URL = BASE_URL + PAGE_PATH
 SITE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "考古題網站")
+# 本機受信任的測試環境，略過 sandbox / GPU / 背景服務等啟動成本
+CHROMIUM_ARGS = [
+    "--no-sandbox",
+    "--disable-dev-shm-usage",
+    "--disable-gpu",
+    "--disable-extensions",
+    "--disable-background-networking",
+    "--disable-sync",
+    "--no-first-run",
+    "--disable-default-apps",
+    "--mute-audio",
+]
+
+# 步驟 6 展開的卡片、步驟 7 起加入書籤的卡片（步驟 10 取消第一張）
+CARD_IDS_TO_EXPAND = ["y114-15a7b19c", "y114-7a4ae0b4", "y114-268fec04"]
+BOOKMARK_CARD_IDS = ["y114-15a7b19c", "y113-15a7b19c", "y112-15a7b19c"]
+CANCEL_CID = BOOKMARK_CARD_IDS[0]
+
+# TRACE_ON_FAIL=1 時每個步驟錄一段 trace chunk，只保留失敗步驟的 chunk 與截圖
+TRACE_ON_FAIL = os.environ.get("TRACE_ON_FAIL") == "1"
+TRACE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+@dataclass
+class TestRun:
+    """一個分組的執行狀態與結果；各分組各自持有，執行緒之間不共用可變清單"""
+    results: list = field(default_factory=list)
+    console_errors: list = field(default_factory=list)
+
+
+# expect() 自動重試的上限；DOM 通常數毫秒內就更新，不必固定等待
+expect.set_options(timeout=2000)
+ACTIVE = re.compile(r"\bactive\b")
+DARK = re.compile(r"\bdark\b")
+
+# 依卡片 id 取回書籤按鈕狀態；true/false 為是否為書籤，null 表示找不到卡片
+# （__bmStates 由 PAGE_HELPERS_JS 安裝）
+GET_BM_STATE = "(ids) => __bmStates(ids)"
+
+# 以下 JS 皆為固定字串、變動部分以參數傳入，讓每次呼叫的原始碼完全相同
+HAS_CLASS = "([id, cls]) => document.getElementById(id).classList.contains(cls)"
+IS_DARK = "() => document.documentElement.classList.contains('dark')"
+VISIBLE_YEAR_CARDS = "() => __visibleYearCards()"
+# 在頁面內依序點擊卡片 header，回傳各卡片是否展開
+CLICK_HEADERS = """(ids) => ids.map(id => {
+    const hdr = document.querySelector(`#${id} .subject-header`);
+    if (!hdr) return false;
+    hdr.click();
+    return document.getElementById(id).classList.contains('open');
+})"""
+# 在頁面內依序點擊書籤按鈕，回傳各按鈕是否為書籤（null 表示找不到按鈕）
+CLICK_BOOKMARKS = """(ids) => ids.map(id => {
+    const btn = document.querySelector(`#${id} .bookmark-btn`);
+    if (!btn) return null;
+    btn.click();
+    return btn.classList.contains('active');
+})"""
+
+# 於頁面載入前安裝在 window 上的共用函式（可見卡片計數、書籤狀態），各步驟以名稱呼叫
+PAGE_HELPERS_JS = """
+(() => {
+    const countVisible = sel => {
+        let count = 0;
+        document.querySelectorAll(sel).forEach(c => { if (c.style.display !== 'none') count++; });
+        return count;
+    };
+    window.__visibleYearCards = () => countVisible('#yearView .subject-card');
+    window.__visibleSubjectCards = () => countVisible('#subjectView .subject-card');
+    window.__bmStates = ids => ids.map(id => {
+        const c = document.getElementById(id);
+        const b = c && c.querySelector('.bookmark-btn');
+        return b ? b.classList.contains('active') : null;
+    });
+})();
+"""
+
+# 將未捕捉的例外與未處理的 Promise rejection 轉送給 Python 端的 __reportErr
+# （console.error 與瀏覽器產生的錯誤訊息由 console 事件蒐集）
+REPORT_ERRORS_JS = """
+(() => {
+    window.addEventListener('error', e => window.__reportErr(e.message));
+    window.addEventListener('unhandledrejection', e => {
+        const r = e.reason;
+        window.__reportErr('Unhandled rejection: ' + String(r && r.message || r));
+    });
+})();
+"""
 
-results = []
-console_errors = []
+# (id(page), selector) -> Locator，重複使用同一頁面的 locator
+_locators = {}
 
 
-def check(step_num: int, name: str, passed: bool, detail: str = ""):
+def check(run: TestRun, step_num: int, name: str, passed: bool, detail: str = ""):
     """記錄單步結果"""
     status = "PASS" if passed else "FAIL"
     msg = f"  [{status}] 步驟 {step_num}: {name}"
     if detail:
         msg += f" — {detail}"
     print(msg)
-    results.append({"step": step_num, "name": name, "passed": passed, "detail": detail})
+    run.results.append({"step": step_num, "name": name, "passed": passed, "detail": detail})
+
+
+def run_step(page, step, run: TestRun):
+    """執行單一步驟；TRACE_ON_FAIL 時失敗（含逾時）才保留該步驟的 trace chunk"""
+    step_id = step.__name__.removeprefix("step_")
+    if TRACE_ON_FAIL:
+        page.context.tracing.start_chunk()
+    first = len(run.results)
+    failed = True
+    try:
+        step(page, run)
+        failed = any(not r["passed"] for r in run.results[first:])
+    finally:
+        if TRACE_ON_FAIL:
+            if failed:
+                path = os.path.join(TRACE_DIR, f"trace-step{step_id}.zip")
+                page.context.tracing.stop_chunk(path=path)
+                page.screenshot(path=os.path.join(TRACE_DIR, f"fail-step{step_id}.png"))
+                print(f"\n  [TRACE] 步驟 {step_id} 失敗追蹤已寫入 {path}")
+            else:
+                page.context.tracing.stop_chunk()
+
+
+def loc(page, selector):
+    """取得（快取的）locator"""
+    key = (id(page), selector)
+    locator = _locators.get(key)
+    if locator is None:
+        locator = _locators[key] = page.locator(selector)
+    return locator
+
+
+def wait_for(expectation, *args, **kwargs):
+    """以 expect() 等待 DOM 達到預期狀態；逾時回傳 False，交由後續 check() 記錄失敗"""
+    try:
+        expectation(*args, **kwargs)
+        return True
+    except AssertionError:
+        return False
 
 
-def print_summary():
-    """印出測試總結"""
+def print_summary(runs):
+    """合併各分組結果並印出測試總結"""
+    results = sorted((r for run in runs for r in run.results), key=lambda r: r["step"])
+    console_errors = [err for run in runs for err in run.console_errors]
     total = len(results)
     passed = sum(1 for r in results if r["passed"])
     failed = total - passed
@@ -53,422 +187,447 @@ def print_summary():
     print()
 
 
+# 功能測試用不到的資源類型：直接回空內容，不實際下載
+BLOCKED_RESOURCE_TYPES = {"image", "font", "media"}
+
+
+def block_non_essential(route):
+    """攔截圖片/字型/媒體請求
+
+    用 fulfill 空內容而非 abort：abort 會讓 Chromium 輸出
+    "Failed to load resource" console error，干擾步驟 16。
+    """
+    if route.request.resource_type in BLOCKED_RESOURCE_TYPES:
+        route.fulfill(status=200, body=b"")
+    else:
+        route.continue_()
+
+
+class QuietHandler(SimpleHTTPRequestHandler):
+    """靜態檔案 handler，不輸出存取記錄"""
+
+    def log_message(self, format, *args):
+        pass
+
+
 def start_server():
-    """啟動 http.server"""
-    proc = subprocess.Popen(
-        [sys.executable, "-m", "http.server", "8767", "--directory", SITE_DIR],
-        stdout=subprocess.DEVNULL,
-        stderr=subprocess.DEVNULL,
-        creationflags=subprocess.CREATE_NEW_PROCESS_GROUP if sys.platform == "win32" else 0,
+    """於背景執行緒啟動靜態檔案伺服器
+
+    建構 ThreadingHTTPServer 時即完成 bind/listen，回傳後即可連線，不需等待。
+    """
+    srv = ThreadingHTTPServer(
+        ("127.0.0.1", PORT), functools.partial(QuietHandler, directory=SITE_DIR)
     )
-    time.sleep(1.5)
-    return proc
+    # shutdown() 需等 serve_forever 的下一次輪詢才返回；縮短輪詢間隔讓關閉幾乎即時
+    threading.Thread(
+        target=srv.serve_forever, kwargs={"poll_interval": SERVER_POLL_INTERVAL}, daemon=True
+    ).start()
+    return srv
 
 
-def stop_server(proc):
-    """停止 http.server"""
-    if proc is None:
+def stop_server(srv):
+    """停止靜態檔案伺服器（最多等待一個輪詢間隔）"""
+    if srv is None:
         return
-    try:
-        if sys.platform == "win32":
-            proc.terminate()
-        else:
-            os.kill(proc.pid, signal.SIGTERM)
-        proc.wait(timeout=5)
-    except Exception:
-        proc.kill()
+    srv.shutdown()
+    srv.server_close()
+
+
+def step_1_2(page, run):
+    """步驟 1: 載入頁面 / 步驟 2: 科目瀏覽切換
+
+    切換為同步處理：在頁面內點擊後，與頁面標題一起在同一次 evaluate 取回。
+    用 getComputedStyle 判斷顯示狀態，CSS 造成的 display:none 也能偵測。
+    """
+    snap = page.evaluate("""() => {
+        document.getElementById('viewSubject').click();
+        return {
+            title: document.title,
+            sv: getComputedStyle(document.getElementById('subjectView')).display,
+            yv: getComputedStyle(document.getElementById('yearView')).display,
+            active: document.getElementById('viewSubject').classList.contains('active'),
+        };
+    }""")
+    title = snap["title"]
+    check(run, 1, "載入頁面", "資訊管理學系" in title, f"標題={title}")
+
+    sv_display, yv_display, btn_active = snap["sv"], snap["yv"], snap["active"]
+    check(
+        run, 2, "科目瀏覽切換",
+        sv_display != "none" and yv_display == "none" and btn_active,
+        f"subjectView display='{sv_display}', yearView display='{yv_display}', btn active={btn_active}"
+    )
 
 
-def run_tests():
-    server_proc = None
-    browser = None
-    pw = None
+def step_3(page, run):
+    """步驟 3: 科目下拉篩選"""
+    # 選擇一個科目：「電腦犯罪偵查」
+    # 篩選為純前端同步邏輯：在頁面內設定下拉值、觸發 change、讀取結果並重置，一次完成
+    target_subject = "電腦犯罪偵查"
+    visible_sv_cards = page.evaluate(
+        """(subject) => {
+            const sel = document.getElementById('subjectFilter');
+            sel.value = subject;
+            sel.dispatchEvent(new Event('change'));
+            const names = [...document.querySelectorAll('#subjectView .subject-card')]
+                .filter(c => c.style.display !== 'none')
+                .map(c => c.querySelector('.subject-header h3').textContent.trim());
+            sel.value = '';
+            sel.dispatchEvent(new Event('change'));
+            return names;
+        }""",
+        target_subject
+    )
+    # 確認在科目視圖下，只有符合該科目的卡片可見
+    all_match = all(target_subject in name for name in visible_sv_cards)
+    check(
+        run, 3, "科目下拉篩選",
+        len(visible_sv_cards) > 0 and all_match,
+        f"可見卡片={len(visible_sv_cards)}, 全部匹配={all_match}"
+    )
 
-    try:
-        # ── 啟動伺服器 ──────────────────────────────────
-        print("\n啟動 HTTP 伺服器 (port 8767)...")
-        server_proc = start_server()
-        print("伺服器已啟動\n")
 
-        # ── 啟動瀏覽器 ──────────────────────────────────
-        pw = sync_playwright().start()
-        browser = pw.chromium.launch(headless=True)
-        context = browser.new_context(viewport={"width": 1280, "height": 900})
-        page = context.new_page()
+def step_4(page, run):
+    """步驟 4: 科目視圖下的搜尋"""
+    # 直接呼叫網站的 doSearch()，略過輸入框的 debounce；搜尋後立即讀取結果再清空
+    snap = page.evaluate(
+        """(q) => {
+            const input = document.getElementById('searchInput');
+            input.value = q;
+            doSearch(q);
+            const stats = document.getElementById('searchStatsText').textContent;
+            const count = __visibleSubjectCards();
+            input.value = '';
+            doSearch('');
+            return { stats, count };
+        }""",
+        "資料庫"
+    )
+    stats_text, visible_sv_search = snap["stats"], snap["count"]
+    check(
+        run, 4, "科目視圖下搜尋「資料庫」",
+        visible_sv_search > 0 and stats_text and "找到" in stats_text,
+        f"搜尋結果統計='{stats_text}'"
+    )
 
-        # 蒐集 console errors
-        page.on("console", lambda msg: (
-            console_errors.append(msg.text) if msg.type == "error" else None
-        ))
 
-        print("開始執行複習者流程測試...\n")
+def step_5(page, run):
+    """步驟 5: 回到年份視圖"""
+    snap = page.evaluate("""() => {
+        switchView('year');
+        return {
+            yv: document.getElementById('yearView').style.display,
+            sv: document.getElementById('subjectView').style.display,
+            active: document.getElementById('viewYear').classList.contains('active'),
+        };
+    }""")
+    yv_display_2, sv_display_2, yr_btn_active = snap["yv"], snap["sv"], snap["active"]
+    check(
+        run, 5, "回到年份視圖",
+        yv_display_2 != "none" and sv_display_2 == "none" and yr_btn_active,
+        f"yearView='{yv_display_2}', subjectView='{sv_display_2}'"
+    )
 
-        # ────────────────────────────────────────────────
-        # 步驟 1: 載入頁面
-        # ────────────────────────────────────────────────
-        page.goto(PAGE_URL, wait_until="networkidle", timeout=15000)
-        title = page.title()
-        check(1, "載入頁面", "資訊管理學系" in title, f"標題={title}")
-
-        # ────────────────────────────────────────────────
-        # 步驟 2: 科目瀏覽切換
-        # ────────────────────────────────────────────────
-        page.click("#viewSubject")
-        page.wait_for_timeout(500)
-        sv_display = page.eval_on_selector("#subjectView", "el => el.style.display")
-        yv_display = page.eval_on_selector("#yearView", "el => el.style.display")
-        btn_active = page.eval_on_selector("#viewSubject", "el => el.classList.contains('active')")
-        check(
-            2, "科目瀏覽切換",
-            sv_display != "none" and yv_display == "none" and btn_active,
-            f"subjectView display='{sv_display}', yearView display='{yv_display}', btn active={btn_active}"
-        )
 
-        # ────────────────────────────────────────────────
-        # 步驟 3: 科目下拉篩選
-        # ────────────────────────────────────────────────
-        # 選擇一個科目：「電腦犯罪偵查」
-        target_subject = "電腦犯罪偵查"
-        page.select_option("#subjectFilter", label=target_subject)
-        page.wait_for_timeout(500)
-
-        # 確認在科目視圖下，只有符合該科目的卡片可見
-        visible_sv_cards = page.eval_on_selector_all(
-            "#subjectView .subject-card",
-            """cards => cards
-                .filter(c => c.style.display !== 'none')
-                .map(c => c.querySelector('.subject-header h3').textContent.trim())
-            """
-        )
-        all_match = all(target_subject in name for name in visible_sv_cards)
-        check(
-            3, "科目下拉篩選",
-            len(visible_sv_cards) > 0 and all_match,
-            f"可見卡片={len(visible_sv_cards)}, 全部匹配={all_match}"
-        )
+def step_6(page, run):
+    """步驟 6: 展開多張卡片"""
+    # 在頁面內依序點擊 3 張卡片的 header（展開處理器為同步執行），一次取回展開狀態
+    opened = page.evaluate(CLICK_HEADERS, CARD_IDS_TO_EXPAND)
+    expanded_count = sum(opened)
 
-        # 重置篩選
-        page.select_option("#subjectFilter", value="")
-        page.wait_for_timeout(300)
-
-        # ────────────────────────────────────────────────
-        # 步驟 4: 科目視圖下的搜尋
-        # ────────────────────────────────────────────────
-        search_input = page.locator("#searchInput")
-        search_input.fill("資料庫")
-        page.wait_for_timeout(500)
-
-        stats_text = page.text_content("#searchStatsText")
-        visible_sv_search = page.eval_on_selector_all(
-            "#subjectView .subject-card",
-            "cards => cards.filter(c => c.style.display !== 'none').length"
-        )
-        has_results = visible_sv_search > 0 if isinstance(visible_sv_search, int) else len(visible_sv_search) > 0
-        check(
-            4, "科目視圖下搜尋「資料庫」",
-            has_results and stats_text and "找到" in stats_text,
-            f"搜尋結果統計='{stats_text}'"
-        )
+    check(
+        run, 6, "展開多張卡片",
+        expanded_count == 3,
+        f"成功展開 {expanded_count}/3 張"
+    )
 
-        # 清空搜尋
-        search_input.fill("")
-        page.wait_for_timeout(300)
-
-        # ────────────────────────────────────────────────
-        # 步驟 5: 回到年份視圖
-        # ────────────────────────────────────────────────
-        page.click("#viewYear")
-        page.wait_for_timeout(500)
-        yv_display_2 = page.eval_on_selector("#yearView", "el => el.style.display")
-        sv_display_2 = page.eval_on_selector("#subjectView", "el => el.style.display")
-        yr_btn_active = page.eval_on_selector("#viewYear", "el => el.classList.contains('active')")
-        check(
-            5, "回到年份視圖",
-            yv_display_2 != "none" and sv_display_2 == "none" and yr_btn_active,
-            f"yearView='{yv_display_2}', subjectView='{sv_display_2}'"
-        )
 
-        # ────────────────────────────────────────────────
-        # 步驟 6: 展開多張卡片
-        # ────────────────────────────────────────────────
-        # 取得前 3 張卡片的 header，點擊展開
-        card_ids_to_expand = ["y114-15a7b19c", "y114-7a4ae0b4", "y114-268fec04"]
-        expanded_count = 0
-        for cid in card_ids_to_expand:
-            header = page.locator(f"#{cid} .subject-header")
-            header.click()
-            page.wait_for_timeout(300)
-            is_open = page.eval_on_selector(f"#{cid}", "el => el.classList.contains('open')")
-            if is_open:
-                expanded_count += 1
-
-        check(
-            6, "展開多張卡片",
-            expanded_count == 3,
-            f"成功展開 {expanded_count}/3 張"
-        )
+def step_7(page, run):
+    """步驟 7: 添加多個書籤"""
+    # 殘留書籤已由 run_shard 的 init script 在頁面載入前清除，不必再重新載入
+    wait_for(expect(loc(page, f"#{BOOKMARK_CARD_IDS[0]} .bookmark-btn")).to_be_attached)
 
-        # ────────────────────────────────────────────────
-        # 步驟 7: 添加多個書籤
-        # ────────────────────────────────────────────────
-        bookmark_card_ids = ["y114-15a7b19c", "y113-15a7b19c", "y112-15a7b19c"]
-        bookmarked_count = 0
-
-        # 先清除 localStorage 的書籤，避免殘留
-        page.evaluate("localStorage.removeItem('exam-bookmarks')")
-        page.reload(wait_until="networkidle")
-        page.wait_for_timeout(500)
-
-        for cid in bookmark_card_ids:
-            bm_btn = page.locator(f"#{cid} .bookmark-btn")
-            bm_btn.scroll_into_view_if_needed()
-            bm_btn.click()
-            page.wait_for_timeout(300)
-            is_active = page.eval_on_selector(
-                f"#{cid} .bookmark-btn", "el => el.classList.contains('active')"
-            )
-            if is_active:
-                bookmarked_count += 1
+    # 在頁面內依序點擊書籤按鈕，一次取回書籤狀態
+    bookmarked = page.evaluate(CLICK_BOOKMARKS, BOOKMARK_CARD_IDS)
+    bookmarked_count = sum(1 for b in bookmarked if b is True)
 
-        check(
-            7, "添加多個書籤",
-            bookmarked_count == 3,
-            f"成功書籤 {bookmarked_count}/3 張"
-        )
+    check(
+        run, 7, "添加多個書籤",
+        bookmarked_count == 3,
+        f"成功書籤 {bookmarked_count}/3 張"
+    )
 
-        # ────────────────────────────────────────────────
-        # 步驟 8: 書籤篩選
-        # ────────────────────────────────────────────────
-        page.click("#bookmarkFilter")
-        page.wait_for_timeout(500)
-        bm_filter_active = page.eval_on_selector(
-            "#bookmarkFilter", "el => el.classList.contains('active')"
-        )
-        visible_bm_cards = page.evaluate("""
-            () => {
-                const cards = document.querySelectorAll('#yearView .subject-card');
-                let count = 0;
-                cards.forEach(c => { if (c.style.display !== 'none') count++; });
-                return count;
-            }
-        """)
-        check(
-            8, "書籤篩選",
-            bm_filter_active and visible_bm_cards == 3,
-            f"篩選啟用={bm_filter_active}, 可見卡片={visible_bm_cards}"
-        )
 
-        # 關閉書籤篩選
-        page.click("#bookmarkFilter")
-        page.wait_for_timeout(300)
-
-        # ────────────────────────────────────────────────
-        # 步驟 9: 科目視圖書籤同步
-        # ────────────────────────────────────────────────
-        page.click("#viewSubject")
-        page.wait_for_timeout(500)
-
-        sync_count = 0
-        for cid in bookmark_card_ids:
-            sv_cid = f"sv-{cid}"
-            is_active = page.evaluate(
-                """(svId) => {
-                    const card = document.getElementById(svId);
-                    if (!card) return false;
-                    const btn = card.querySelector('.bookmark-btn');
-                    return btn ? btn.classList.contains('active') : false;
-                }""",
-                sv_cid
-            )
-            if is_active:
-                sync_count += 1
+def step_8(page, run):
+    """步驟 8: 書籤篩選"""
+    page.click("#bookmarkFilter")
+    wait_for(expect(loc(page, "#bookmarkFilter")).to_have_class, ACTIVE)
+    bm_filter_active = page.evaluate(HAS_CLASS, ["bookmarkFilter", "active"])
+    visible_bm_cards = page.evaluate(VISIBLE_YEAR_CARDS)
+    check(
+        run, 8, "書籤篩選",
+        bm_filter_active and visible_bm_cards == 3,
+        f"篩選啟用={bm_filter_active}, 可見卡片={visible_bm_cards}"
+    )
 
-        check(
-            9, "科目視圖書籤同步",
-            sync_count == 3,
-            f"同步書籤 {sync_count}/3 張（實心星星）"
-        )
+    # 關閉書籤篩選
+    page.click("#bookmarkFilter")
+    wait_for(expect(loc(page, "#bookmarkFilter")).not_to_have_class, ACTIVE)
 
-        # ────────────────────────────────────────────────
-        # 步驟 10: 取消書籤
-        # ────────────────────────────────────────────────
-        cancel_cid = bookmark_card_ids[0]  # y114-15a7b19c
-        sv_cancel_cid = f"sv-{cancel_cid}"
-        sv_bm_btn = page.locator(f"#{sv_cancel_cid} .bookmark-btn")
-        sv_bm_btn.scroll_into_view_if_needed()
-        sv_bm_btn.click()
-        page.wait_for_timeout(300)
-
-        is_cancelled = page.evaluate(
-            """(svId) => {
-                const card = document.getElementById(svId);
-                if (!card) return false;
-                const btn = card.querySelector('.bookmark-btn');
-                return btn ? !btn.classList.contains('active') : false;
-            }""",
-            sv_cancel_cid
-        )
-        check(
-            10, "取消書籤（科目視圖）",
-            is_cancelled,
-            f"取消 {sv_cancel_cid} 書籤 = {is_cancelled}"
-        )
 
-        # ────────────────────────────────────────────────
-        # 步驟 11: 回到年份視圖驗證
-        # ────────────────────────────────────────────────
-        page.click("#viewYear")
-        page.wait_for_timeout(500)
-
-        yr_bm_cancelled = page.evaluate(
-            """(cid) => {
-                const card = document.getElementById(cid);
-                if (!card) return false;
-                const btn = card.querySelector('.bookmark-btn');
-                return btn ? !btn.classList.contains('active') : false;
-            }""",
-            cancel_cid
-        )
-        # 確認另外兩個仍然是書籤
-        yr_bm_still_1 = page.evaluate(
-            """(cid) => {
-                const card = document.getElementById(cid);
-                if (!card) return false;
-                const btn = card.querySelector('.bookmark-btn');
-                return btn ? btn.classList.contains('active') : false;
-            }""",
-            bookmark_card_ids[1]
-        )
-        yr_bm_still_2 = page.evaluate(
-            """(cid) => {
-                const card = document.getElementById(cid);
-                if (!card) return false;
-                const btn = card.querySelector('.bookmark-btn');
-                return btn ? btn.classList.contains('active') : false;
-            }""",
-            bookmark_card_ids[2]
-        )
-        check(
-            11, "回到年份視圖驗證",
-            yr_bm_cancelled and yr_bm_still_1 and yr_bm_still_2,
-            f"取消={yr_bm_cancelled}, 保留1={yr_bm_still_1}, 保留2={yr_bm_still_2}"
-        )
+def step_9(page, run):
+    """步驟 9: 科目視圖書籤同步"""
+    page.click("#viewSubject")
+    wait_for(expect(loc(page, "#subjectView")).to_be_visible)
 
-        # ────────────────────────────────────────────────
-        # 步驟 12: 書籤篩選更新
-        # ────────────────────────────────────────────────
-        page.click("#bookmarkFilter")
-        page.wait_for_timeout(500)
-        visible_bm_cards_2 = page.evaluate("""
-            () => {
-                const cards = document.querySelectorAll('#yearView .subject-card');
-                let count = 0;
-                cards.forEach(c => { if (c.style.display !== 'none') count++; });
-                return count;
-            }
-        """)
-        check(
-            12, "書籤篩選更新",
-            visible_bm_cards_2 == 2,
-            f"可見卡片={visible_bm_cards_2}（預期 2）"
-        )
+    states = page.evaluate(
+        GET_BM_STATE,
+        [f"sv-{cid}" for cid in BOOKMARK_CARD_IDS]
+    )
+    sync_count = sum(1 for st in states if st is True)
 
-        # ────────────────────────────────────────────────
-        # 步驟 13: 搜尋 + 書籤組合
-        # ────────────────────────────────────────────────
-        # 書籤篩選仍然開啟，搜尋「憲法」
-        # 注意：網站的 doSearch() 不會交叉過濾書籤狀態，
-        # 搜尋會獨立於書籤篩選運作（即搜尋結果不限於書籤卡片）。
-        # 這裡驗證：在書籤篩選開啟的狀態下搜尋仍然能正常運作，
-        # 並且搜尋結果數量 > 0（代表搜尋功能有作用）。
-        search_input = page.locator("#searchInput")
-        search_input.fill("憲法")
-        page.wait_for_timeout(500)
-
-        visible_combo = page.evaluate("""
-            () => {
-                const cards = document.querySelectorAll('#yearView .subject-card');
-                let count = 0;
-                cards.forEach(c => { if (c.style.display !== 'none') count++; });
-                return count;
-            }
-        """)
-        stats_13 = page.text_content("#searchStatsText")
-        # 搜尋「憲法」在年份視圖應匹配多張（每年都有「中華民國憲法與警察專業英文」）
-        # 網站行為：搜尋覆蓋書籤篩選（不做交叉過濾），這是已知的設計限制
-        search_works = visible_combo > 0 and stats_13 and "找到" in stats_13
-        check(
-            13, "搜尋 + 書籤組合",
-            search_works,
-            f"搜尋結果={visible_combo}, 統計='{stats_13}' "
-            f"（注意: 網站搜尋不與書籤篩選交叉過濾，此為已知設計限制）"
-        )
+    check(
+        run, 9, "科目視圖書籤同步",
+        sync_count == 3,
+        f"同步書籤 {sync_count}/3 張（實心星星）"
+    )
 
-        # 清空搜尋，關閉書籤篩選
-        search_input.fill("")
-        page.wait_for_timeout(300)
-        page.click("#bookmarkFilter")
-        page.wait_for_timeout(300)
-
-        # ────────────────────────────────────────────────
-        # 步驟 14: 深色模式切換
-        # ────────────────────────────────────────────────
-        # 第一次切換：開啟深色模式
-        page.click("#darkToggle")
-        page.wait_for_timeout(400)
-        is_dark_1 = page.evaluate("document.documentElement.classList.contains('dark')")
-
-        # 第二次切換：關閉深色模式
-        page.click("#darkToggle")
-        page.wait_for_timeout(400)
-        is_dark_2 = page.evaluate("document.documentElement.classList.contains('dark')")
-
-        check(
-            14, "深色模式切換",
-            is_dark_1 and not is_dark_2,
-            f"第一次(開)={is_dark_1}, 第二次(關)={is_dark_2}"
-        )
 
-        # ────────────────────────────────────────────────
-        # 步驟 15: localStorage 驗證
-        # ────────────────────────────────────────────────
-        ls_bookmarks = page.evaluate("localStorage.getItem('exam-bookmarks')")
-        has_bm_data = ls_bookmarks is not None and len(ls_bookmarks) > 2
-        check(
-            15, "localStorage 驗證",
-            has_bm_data,
-            f"exam-bookmarks = {ls_bookmarks[:80] if ls_bookmarks else 'null'}..."
-        )
+def step_10(page, run):
+    """步驟 10: 取消書籤"""
+    sv_cancel_cid = f"sv-{CANCEL_CID}"
+    # 直接在頁面內觸發按鈕的 click 處理器：測試對象是書籤邏輯而非指標事件，
+    # 不需要捲動與 actionability 檢查
+    is_cancelled = page.evaluate(CLICK_BOOKMARKS, [sv_cancel_cid])[0] is False
+    check(
+        run, 10, "取消書籤（科目視圖）",
+        is_cancelled,
+        f"取消 {sv_cancel_cid} 書籤 = {is_cancelled}"
+    )
 
-        # ────────────────────────────────────────────────
-        # 步驟 16: 零 Console 錯誤
-        # ────────────────────────────────────────────────
-        check(
-            16, "零 Console 錯誤",
-            len(console_errors) == 0,
-            f"共 {len(console_errors)} 個錯誤" + (f": {console_errors}" if console_errors else "")
+
+def step_11(page, run):
+    """步驟 11: 回到年份視圖驗證"""
+    page.click("#viewYear")
+    wait_for(expect(loc(page, "#yearView")).to_be_visible)
+
+    # 取消的那張應為非書籤，另外兩個仍然是書籤（null 表示找不到卡片）
+    yr_bm_cancelled, yr_bm_still_1, yr_bm_still_2 = (
+        st is expected for st, expected in zip(
+            page.evaluate(GET_BM_STATE, [CANCEL_CID, BOOKMARK_CARD_IDS[1], BOOKMARK_CARD_IDS[2]]),
+            (False, True, True),
         )
+    )
+    check(
+        run, 11, "回到年份視圖驗證",
+        yr_bm_cancelled and yr_bm_still_1 and yr_bm_still_2,
+        f"取消={yr_bm_cancelled}, 保留1={yr_bm_still_1}, 保留2={yr_bm_still_2}"
+    )
+
+
+def step_12(page, run):
+    """步驟 12: 書籤篩選更新"""
+    page.click("#bookmarkFilter")
+    wait_for(expect(loc(page, "#bookmarkFilter")).to_have_class, ACTIVE)
+    visible_bm_cards_2 = page.evaluate(VISIBLE_YEAR_CARDS)
+    check(
+        run, 12, "書籤篩選更新",
+        visible_bm_cards_2 == 2,
+        f"可見卡片={visible_bm_cards_2}（預期 2）"
+    )
+
+
+def step_13(page, run):
+    """步驟 13: 搜尋 + 書籤組合"""
+    # 書籤篩選仍然開啟，搜尋「憲法」
+    # 注意：網站的 doSearch() 不會交叉過濾書籤狀態，
+    # 搜尋會獨立於書籤篩選運作（即搜尋結果不限於書籤卡片）。
+    # 這裡驗證：在書籤篩選開啟的狀態下搜尋仍然能正常運作，
+    # 並且搜尋結果數量 > 0（代表搜尋功能有作用）。
+    search_input = loc(page, "#searchInput")
+    search_input.fill("憲法")
+    wait_for(expect(loc(page, "#searchStatsText")).to_contain_text, "找到")
+
+    snap = page.evaluate("""() => ({
+        count: __visibleYearCards(),
+        stats: document.getElementById('searchStatsText').textContent,
+    })""")
+    visible_combo, stats_13 = snap["count"], snap["stats"]
+    # 搜尋「憲法」在年份視圖應匹配多張（每年都有「中華民國憲法與警察專業英文」）
+    # 網站行為：搜尋覆蓋書籤篩選（不做交叉過濾），這是已知的設計限制
+    search_works = visible_combo > 0 and stats_13 and "找到" in stats_13
+    check(
+        run, 13, "搜尋 + 書籤組合",
+        search_works,
+        f"搜尋結果={visible_combo}, 統計='{stats_13}' "
+        f"（注意: 網站搜尋不與書籤篩選交叉過濾，此為已知設計限制）"
+    )
+
+    # 清空搜尋，關閉書籤篩選
+    search_input.fill("")
+    wait_for(expect(loc(page, "#searchStatsText")).to_have_text, "")
+    page.click("#bookmarkFilter")
+    wait_for(expect(loc(page, "#bookmarkFilter")).not_to_have_class, ACTIVE)
+
+
+def step_14(page, run):
+    """步驟 14: 深色模式切換"""
+    # 第一次切換：開啟深色模式
+    page.click("#darkToggle")
+    wait_for(expect(loc(page, "html")).to_have_class, DARK)
+    is_dark_1 = page.evaluate(IS_DARK)
+
+    # 第二次切換：關閉深色模式
+    page.click("#darkToggle")
+    wait_for(expect(loc(page, "html")).not_to_have_class, DARK)
+    is_dark_2 = page.evaluate(IS_DARK)
+
+    check(
+        run, 14, "深色模式切換",
+        is_dark_1 and not is_dark_2,
+        f"第一次(開)={is_dark_1}, 第二次(關)={is_dark_2}"
+    )
+
+
+def step_15(page, run):
+    """步驟 15: localStorage 驗證"""
+    ls_bookmarks = page.evaluate("localStorage.getItem('exam-bookmarks')")
+    has_bm_data = ls_bookmarks is not None and len(ls_bookmarks) > 2
+    check(
+        run, 15, "localStorage 驗證",
+        has_bm_data,
+        f"exam-bookmarks = {ls_bookmarks[:80] if ls_bookmarks else 'null'}..."
+    )
+
+
+def step_16(run):
+    """步驟 16: 零 Console 錯誤"""
+    check(
+        run, 16, "零 Console 錯誤",
+        len(run.console_errors) == 0,
+        f"共 {len(run.console_errors)} 個錯誤" + (f": {run.console_errors}" if run.console_errors else "")
+    )
+
+
+# 分組遇到 Playwright 逾時時的重試次數
+SHARD_RETRIES = 1
 
+# 依資料相依性分組：同組步驟共用同一頁面狀態、依序執行；各組彼此獨立、平行執行。
+# 步驟 16 統計所有分組的 console error，於全部分組結束後執行。
+SHARDS = [
+    (step_1_2, step_3, step_4, step_5, step_14),
+    (step_6,),
+    (step_7, step_8, step_9, step_10, step_11, step_12, step_13, step_15),
+]
+
+
+def new_shard_context(browser, run):
+    """建立分組用的全新 context，註冊路由攔截、錯誤蒐集與頁面輔助函式
+
+    重試時也開新的 context（瀏覽器維持不動），localStorage 等狀態不會帶到下一次。
+    """
+    context = browser.new_context(viewport={"width": 1280, "height": 900})
+    if TRACE_ON_FAIL:
+        context.tracing.start(snapshots=False, screenshots=False, sources=False)
+    context.route("**/*", block_non_essential)
+    # 每次載入前先清除書籤，確保從乾淨狀態開始
+    context.add_init_script(
+        "try { localStorage.removeItem('exam-bookmarks'); } catch (e) {}"
+    )
+    # 蒐集 console errors：console 事件涵蓋 console.error 以及資源載入失敗、
+    # CSP、mixed content 等瀏覽器產生的錯誤；例外與 rejection 由 init script 回報
+    def on_console(msg):
+        if msg.type != "error":
+            return
+        run.console_errors.append(msg.text)
+
+    context.on("console", on_console)
+    context.expose_function("__reportErr", run.console_errors.append)
+    context.add_init_script(REPORT_ERRORS_JS)
+    context.add_init_script(PAGE_HELPERS_JS)
+    return context
+
+
+def with_fresh_page(context, steps, run):
+    """在 context 中開新分頁載入測試頁並依序執行 steps，結束後關閉分頁"""
+    page = context.new_page()
+    try:
+        # 不等 networkidle（最後一個請求後還要多等 500ms），改等實際需要的元素出現
+        page.goto(PAGE_URL, wait_until="domcontentloaded", timeout=NAV_TIMEOUT)
+        expect(loc(page, "#viewSubject")).to_be_visible(timeout=3000)
+        for step in steps:
+            run_step(page, step, run)
+    finally:
+        page.close()
+        # 關閉後 id(page) 可能被新分頁重用，清掉這頁的 locator 快取
+        for key in [k for k in _locators if k[0] == id(page)]:
+            del _locators[key]
+
+
+def run_shard(index, steps, run):
+    """在獨立的瀏覽器中依序執行一組步驟。
+
+    Playwright sync API 的物件綁定建立它的執行緒，無法跨執行緒共用同一個
+    browser，因此每組各自啟動 playwright 與 browser。每次執行都用全新的
+    context，不沿用上次的 service worker、快取與 localStorage。
+    """
+    try:
+        with sync_playwright() as pw:
+            browser = pw.chromium.launch(
+                headless=True,
+                args=CHROMIUM_ARGS,
+                chromium_sandbox=False,
+            )
+            context = None
+            try:
+                for attempt in range(SHARD_RETRIES + 1):
+                    context = new_shard_context(browser, run)
+                    try:
+                        with_fresh_page(context, steps, run)
+                        break
+                    except PWTimeout as e:
+                        if attempt == SHARD_RETRIES:
+                            raise
+                        print(f"\n  [RETRY] 分組 {index} 逾時，以新 context 重試: {e}")
+                        context.close()
+                        context = None
+                        run.results.clear()
+                        run.console_errors.clear()
+            finally:
+                # 逾時或例外時也要關閉（失敗步驟的 trace chunk 已在 run_step 寫出）
+                if context is not None:
+                    context.close()
+                browser.close()
     except PWTimeout as e:
         print(f"\n  [ERROR] Playwright 逾時: {e}")
     except Exception as e:
         print(f"\n  [ERROR] 未預期的錯誤: {e}")
         import traceback
         traceback.print_exc()
+
+
+def run_tests():
+    server = None
+    runs = [TestRun() for _ in SHARDS]
+    final = TestRun()
+
+    try:
+        # ── 啟動伺服器 ──────────────────────────────────
+        print("\n啟動 HTTP 伺服器 (port 8767)...")
+        server = start_server()
+        print("伺服器已啟動\n")
+
+        print("開始執行複習者流程測試...\n")
+        workers = max(1, min(len(SHARDS), (os.cpu_count() or 1) - 2))
+        with ThreadPoolExecutor(max_workers=workers) as ex:
+            list(ex.map(run_shard, range(len(SHARDS)), SHARDS, runs))
+
+        final.console_errors = [err for run in runs for err in run.console_errors]
+        step_16(final)
     finally:
         # ── 清理 ──────────────────────────────────────
-        if browser:
-            try:
-                browser.close()
-            except Exception:
-                pass
-        if pw:
-            try:
-                pw.stop()
-            except Exception:
-                pass
-        stop_server(server_proc)
-        print_summary()
+        stop_server(server)
+        print_summary(runs + [final])
 
 
 if __name__ == "__main__":
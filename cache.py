@@ -4,42 +4,88 @@
 實現下載記錄快取，避免重複下載
 """
 
+import os
 import json
+import atexit
 import hashlib
+import threading
 from pathlib import Path
 from datetime import datetime
 from typing import Dict, Optional, Any
 
+try:
+    import orjson
+
+    def _dumps(obj) -> bytes:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2)
+
+    _loads = orjson.loads
+except ImportError:
+    def _dumps(obj) -> bytes:
+        return json.dumps(obj, ensure_ascii=False, indent=2).encode('utf-8')
+
+    _loads = json.loads
+
 
 class DownloadCache:
-    """下載快取管理器"""
+    """下載快取管理器
+
+    讀取直接查 dict（GIL 下為原子操作），僅寫入與存檔需持鎖。
+    寫入只標記 dirty，由計時器批次存檔，程式結束時再補存一次。
+    """
 
-    def __init__(self, cache_file='.download_cache.json'):
+    def __init__(self, cache_file='.download_cache.json', flush_interval=5.0):
         """
         Args:
             cache_file (str): 快取檔案路徑
+            flush_interval (float): 延遲存檔秒數
         """
         self.cache_file = Path(__file__).parent / cache_file
         self.cache = self._load_cache()
+        self._lock = threading.Lock()
+        self._dirty = False
+        self._flush_interval = flush_interval
+        self._timer: Optional[threading.Timer] = None
+        atexit.register(self.flush)
 
     def _load_cache(self) -> Dict[str, Dict[str, Any]]:
         """載入快取"""
         if self.cache_file.exists():
             try:
-                with open(self.cache_file, 'r', encoding='utf-8') as f:
-                    return json.load(f)
+                return _loads(self.cache_file.read_bytes())
             except Exception as e:
                 print(f"⚠️ 載入快取失敗: {e}")
         return {}
 
     def _save_cache(self):
-        """儲存快取"""
+        """儲存快取（先寫暫存檔再替換，避免中斷時留下半個檔案）"""
+        # 暫存檔名含 pid，多個行程同時存檔時不會寫到同一個暫存檔
+        tmp_file = self.cache_file.with_name(f"{self.cache_file.name}.{os.getpid()}.tmp")
         try:
-            with open(self.cache_file, 'w', encoding='utf-8') as f:
-                json.dump(self.cache, f, ensure_ascii=False, indent=2)
+            tmp_file.write_bytes(_dumps(self.cache))
+            os.replace(tmp_file, self.cache_file)
         except Exception as e:
             print(f"⚠️ 儲存快取失敗: {e}")
 
+    def _mark_dirty(self):
+        """標記需存檔並排程計時器（呼叫端需持鎖）"""
+        self._dirty = True
+        if self._timer is None:
+            self._timer = threading.Timer(self._flush_interval, self.flush)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def flush(self):
+        """立即寫出尚未存檔的變更"""
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            if not self._dirty:
+                return
+            self._save_cache()
+            self._dirty = False
+
     def _generate_key(self, url: str, file_path: str) -> str:
         """生成快取鍵值
 
@@ -72,8 +118,9 @@ class DownloadCache:
         # 檢查檔案是否仍存在
         if not Path(file_path).exists():
             # 檔案不存在，移除快取記錄
-            del self.cache[key]
-            self._save_cache()
+            with self._lock:
+                if self.cache.pop(key, None) is not None:
+                    self._mark_dirty()
             return False
 
         return True
@@ -94,14 +141,16 @@ class DownloadCache:
             metadata: 額外的元資料
         """
         key = self._generate_key(url, file_path)
-        self.cache[key] = {
+        entry = {
             'url': url,
             'file_path': file_path,
             'file_size': file_size,
             'downloaded_at': datetime.now().isoformat(),
             'metadata': metadata or {}
         }
-        self._save_cache()
+        with self._lock:
+            self.cache[key] = entry
+            self._mark_dirty()
 
     def get_info(self, url: str, file_path: str) -> Optional[Dict[str, Any]]:
         """取得快取資訊
@@ -118,8 +167,9 @@ class DownloadCache:
 
     def clear_cache(self):
         """清除所有快取"""
-        self.cache = {}
-        self._save_cache()
+        with self._lock:
+            self.cache = {}
+            self._mark_dirty()
 
     def get_stats(self) -> Dict[str, Any]:
         """取得快取統計
@@ -127,9 +177,11 @@ class DownloadCache:
         Returns:
             Dict: 統計資訊
         """
-        total_size = sum(item.get('file_size', 0) for item in self.cache.values())
+        with self._lock:
+            entries = list(self.cache.values())
+        total_size = sum(item.get('file_size', 0) for item in entries)
         return {
-            'total_files': len(self.cache),
+            'total_files': len(entries),
             'total_size': total_size,
             'total_size_mb': total_size / (1024 * 1024)
         }
@@ -141,18 +193,19 @@ class DownloadCache:
             int: 移除的記錄數
         """
         removed = 0
-        keys_to_remove = []
 
-        for key, info in self.cache.items():
-            if not Path(info['file_path']).exists():
-                keys_to_remove.append(key)
+        with self._lock:
+            keys_to_remove = [
+                key for key, info in self.cache.items()
+                if not Path(info['file_path']).exists()
+            ]
 
-        for key in keys_to_remove:
-            del self.cache[key]
-            removed += 1
+            for key in keys_to_remove:
+                del self.cache[key]
+                removed += 1
 
-        if removed > 0:
-            self._save_cache()
+            if removed > 0:
+                self._mark_dirty()
 
         return removed
 
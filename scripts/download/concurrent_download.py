@@ -11,7 +11,7 @@ from dataclasses import dataclass
 from threading import Lock
 
 
-@dataclass
+@dataclass(slots=True)
 class DownloadTask:
     """下載任務"""
     url: str
@@ -19,7 +19,7 @@ class DownloadTask:
     metadata: Dict[str, Any] = None
 
 
-@dataclass
+@dataclass(slots=True)
 class DownloadResult:
     """下載結果"""
     task: DownloadTask
@@ -1,6 +1,7 @@
 import os
+import functools
 import requests
-from bs4 import BeautifulSoup, Tag
+from bs4 import BeautifulSoup, SoupStrainer, Tag
 from bs4.element import NavigableString
 import time
 import re
@@ -28,21 +29,40 @@ HEADERS = {
     'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
     'Accept-Language': 'zh-TW,zh;q=0.9,en-US;q=0.8,en;q=0.7',
     'Connection': 'keep-alive'}
+# 下載寫檔的區塊大小：較大的區塊可減少 write() 次數
+DOWNLOAD_CHUNK_SIZE = 128 * 1024
 
 # 動態計算年份範圍（民國年）
 
 
+@functools.lru_cache(maxsize=1)
 def get_available_years():
-    """動態計算可用的年份範圍"""
-    from datetime import datetime
+    """動態計算可用的年份範圍（結果快取，回傳不可變的 range）"""
     current_year = datetime.now().year
     current_minguo_year = current_year - 1911
 
     # 從民國81年開始到當前年份（包含明年，以防萬一）
-    return list(range(81, current_minguo_year + 2))
+    return range(81, current_minguo_year + 2)
 
 
 AVAILABLE_YEARS = get_available_years()
+
+# 檔名非法字元刪除表（str.translate 單次掃描）
+_ILLEGAL_FILENAME_CHARS = str.maketrans('', '', '\\/*?:"<>|')
+
+# 年度考試列表頁只需解析考試代碼下拉選單
+_EXAM_SELECT_ONLY = SoupStrainer('select', id=re.compile(r'ddlExamCode'))
+
+# 考試頁面下載連結解析
+_EXAM_FILE_HREF = re.compile(r'wHandExamQandA_File\.ashx')
+_CODE_PARAM = re.compile(r'[&?]c=(\d+)')
+_TYPE_PARAM = re.compile(r'[&?]t=([QSMR])')
+FILE_TYPE_NAMES = {
+    'Q': '試題',
+    'S': '答案',
+    'M': '更正答案',
+    'R': '參考答案'
+}
 # --- ---
 
 
@@ -87,10 +107,14 @@ def get_save_folder():
             os.makedirs(abs_path, exist_ok=True)
 
             # 檢查是否可寫入
-            test_file = os.path.join(abs_path, '.test_write')
-            with open(test_file, 'w') as f:
-                f.write('test')
-            os.remove(test_file)
+            if os.name == 'nt':
+                # Windows 的 os.access 不檢查 ACL，仍以實際寫檔探測
+                test_file = os.path.join(abs_path, '.test_write')
+                with open(test_file, 'w') as f:
+                    f.write('test')
+                os.remove(test_file)
+            elif not os.access(abs_path, os.W_OK):
+                raise PermissionError(abs_path)
 
             print(f"✅ 已設定儲存位置: {abs_path}\n")
             return abs_path
@@ -103,6 +127,12 @@ def get_save_folder():
             print("   請重新輸入\n")
 
 
+def _parse_year(text):
+    """解析單一民國年；非純數字回傳 None（不以例外處理無效輸入）"""
+    text = text.strip()
+    return int(text) if text.isdecimal() else None
+
+
 def get_year_input():
     """互動式輸入年份範圍"""
     print("【步驟 2/3】設定下載年份")
@@ -121,60 +151,63 @@ def get_year_input():
             print("❌ 輸入不可為空，請重新輸入\n")
             continue
 
-        try:
-            # 全部年份
-            if user_input.lower() in ['all', '*', '全部']:
-                return list(AVAILABLE_YEARS)
-
-            # 年份範圍
-            elif '-' in user_input:
-                parts = user_input.split('-')
-                if len(parts) != 2:
-                    raise ValueError
-                start = int(parts[0].strip())
-                end = int(parts[1].strip())
-
-                # 動態檢查年份範圍
-                max_year = AVAILABLE_YEARS[-1] if AVAILABLE_YEARS else 114
-                if not (
-                        AVAILABLE_YEARS[0] <= start <= max_year and AVAILABLE_YEARS[0] <= end <= max_year and start <= end):
-                    print(
-                        f"❌ 年份範圍必須在 {AVAILABLE_YEARS[0]}-{max_year} 之間，且起始年份不可大於結束年份\n")
-                    continue
+        # 全部年份
+        if user_input.lower() in ['all', '*', '全部']:
+            return list(AVAILABLE_YEARS)
+
+        # 年份範圍
+        elif '-' in user_input:
+            parts = user_input.split('-')
+            start = _parse_year(parts[0]) if len(parts) == 2 else None
+            end = _parse_year(parts[1]) if len(parts) == 2 else None
+            if start is None or end is None:
+                print("❌ 輸入格式錯誤，請重新輸入\n")
+                continue
 
-                years = list(range(start, end + 1))
-                print(f"✅ 已選擇: 民國 {start} 年 ~ {end} 年 (共 {len(years)} 年)\n")
-                return years
+            # 動態檢查年份範圍
+            max_year = AVAILABLE_YEARS[-1] if AVAILABLE_YEARS else 114
+            if not (
+                    AVAILABLE_YEARS[0] <= start <= max_year and AVAILABLE_YEARS[0] <= end <= max_year and start <= end):
+                print(
+                    f"❌ 年份範圍必須在 {AVAILABLE_YEARS[0]}-{max_year} 之間，且起始年份不可大於結束年份\n")
+                continue
 
-            # 多個年份
-            elif ',' in user_input:
-                years = [int(y.strip()) for y in user_input.split(',')]
+            years = list(range(start, end + 1))
+            print(f"✅ 已選擇: 民國 {start} 年 ~ {end} 年 (共 {len(years)} 年)\n")
+            return years
 
-                # 動態檢查年份範圍
-                max_year = AVAILABLE_YEARS[-1] if AVAILABLE_YEARS else 114
-                if not all(AVAILABLE_YEARS[0] <= y <= max_year for y in years):
-                    print(f"❌ 所有年份必須在 {AVAILABLE_YEARS[0]}-{max_year} 之間\n")
-                    continue
+        # 多個年份
+        elif ',' in user_input:
+            years = [_parse_year(y) for y in user_input.split(',')]
+            if None in years:
+                print("❌ 輸入格式錯誤，請重新輸入\n")
+                continue
 
-                years = sorted(list(set(years)))
-                print(
-                    f"✅ 已選擇: {len(years)} 個年份: {', '.join(map(str, years))}\n")
-                return years
+            # 動態檢查年份範圍
+            max_year = AVAILABLE_YEARS[-1] if AVAILABLE_YEARS else 114
+            if not all(AVAILABLE_YEARS[0] <= y <= max_year for y in years):
+                print(f"❌ 所有年份必須在 {AVAILABLE_YEARS[0]}-{max_year} 之間\n")
+                continue
 
-            # 單一年份
-            else:
-                year = int(user_input)
-                max_year = AVAILABLE_YEARS[-1] if AVAILABLE_YEARS else 114
-                if not (AVAILABLE_YEARS[0] <= year <= max_year):
-                    print(f"❌ 年份必須在 {AVAILABLE_YEARS[0]}-{max_year} 之間\n")
-                    continue
+            years = sorted(list(set(years)))
+            print(
+                f"✅ 已選擇: {len(years)} 個年份: {', '.join(map(str, years))}\n")
+            return years
 
-                print(f"✅ 已選擇: 民國 {year} 年\n")
-                return [year]
+        # 單一年份
+        else:
+            year = _parse_year(user_input)
+            if year is None:
+                print("❌ 輸入格式錯誤，請重新輸入\n")
+                continue
 
-        except ValueError:
-            print("❌ 輸入格式錯誤，請重新輸入\n")
-            continue
+            max_year = AVAILABLE_YEARS[-1] if AVAILABLE_YEARS else 114
+            if not (AVAILABLE_YEARS[0] <= year <= max_year):
+                print(f"❌ 年份必須在 {AVAILABLE_YEARS[0]}-{max_year} 之間\n")
+                continue
+
+            print(f"✅ 已選擇: 民國 {year} 年\n")
+            return [year]
 
 
 def get_filter_input():
@@ -248,13 +281,18 @@ def confirm_settings(save_dir, years, keywords):
 
 def sanitize_filename(name):
     """清理檔名中的非法字元"""
-    name = html.unescape(name)
-    name = re.sub(r'[\\/*?:"<>|]', "", name)
+    name = html.unescape(name).translate(_ILLEGAL_FILENAME_CHARS)
     if len(name) > 80:  # 降低長度限制以避免路徑過長
         name = name[:80]
     return name.strip()
 
 
+@functools.lru_cache(maxsize=1)
+def _cached_cwd():
+    """工作目錄（本程式不會 chdir，取一次即可）"""
+    return os.getcwd()
+
+
 def check_path_length(path, max_length=250):
     """檢查路徑長度是否超過限制
 
@@ -265,7 +303,11 @@ def check_path_length(path, max_length=250):
     Returns:
         tuple: (是否合法, 實際長度)
     """
-    abs_path = os.path.abspath(path)
+    # 等同 os.path.abspath，但已是絕對路徑時不必每次呼叫 getcwd
+    if os.path.isabs(path):
+        abs_path = os.path.normpath(path)
+    else:
+        abs_path = os.path.normpath(os.path.join(_cached_cwd(), path))
     path_length = len(abs_path)
     return path_length <= max_length, path_length
 
@@ -278,7 +320,7 @@ def get_exam_list_by_year(session, year, keywords, max_retries=3):
             response = session.get(url, timeout=30, verify=False)
             response.raise_for_status()
 
-            soup = BeautifulSoup(response.text, 'html.parser')
+            soup = BeautifulSoup(response.text, 'lxml', parse_only=_EXAM_SELECT_ONLY)
             exam_select = soup.find("select", id=re.compile(r'ddlExamCode'))
             if not exam_select:
                 return []
@@ -337,17 +379,16 @@ def parse_exam_page(html_content, exam_name=""):
     適用年份：90-114年
     目標類科：警察人員三等14類 + 司法三等2類（監獄官）
     """
-    from bs4 import BeautifulSoup, Tag
-    import re
     import html as html_module
     from collections import defaultdict
 
-    soup = BeautifulSoup(html_content, 'html.parser')
+    # lxml 為 C 實作的解析器，考試頁面連結多時明顯快於 html.parser
+    soup = BeautifulSoup(html_content, 'lxml')
 
     # 步驟1：收集所有類科代碼的科目和下載連結
     raw_structure = defaultdict(lambda: defaultdict(dict))
 
-    links = soup.find_all('a', href=re.compile(r'wHandExamQandA_File\.ashx'))
+    links = soup.find_all('a', href=_EXAM_FILE_HREF)
 
     for link in links:
         if not isinstance(link, Tag):
@@ -359,20 +400,15 @@ def parse_exam_page(html_content, exam_name=""):
 
         # 解析URL參數
         href_str = str(href)
-        code_match = re.search(r'[&?]c=(\d+)', href_str)
-        type_match = re.search(r'[&?]t=([QSMR])', href_str)
+        code_match = _CODE_PARAM.search(href_str)
+        type_match = _TYPE_PARAM.search(href_str)
 
         if not code_match:
             continue
 
         category_code = code_match.group(1)
         file_type_code = type_match.group(1) if type_match else 'Q'
-        file_type = {
-            'Q': '試題',
-            'S': '答案',
-            'M': '更正答案',
-            'R': '參考答案'
-        }.get(file_type_code, '試題')
+        file_type = FILE_TYPE_NAMES.get(file_type_code, '試題')
 
         # 找科目名稱
         tr = link.find_parent('tr')
@@ -564,7 +600,7 @@ def download_file(session, url, file_path, max_retries=5):
                 return False, "非PDF檔案"
 
             with open(file_path, 'wb') as f:
-                for chunk in response.iter_content(chunk_size=8192):
+                for chunk in response.iter_content(chunk_size=DOWNLOAD_CHUNK_SIZE):
                     if chunk:
                         f.write(chunk)
 
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""DownloadCache 測試：延遲存檔、計時器存檔、多執行緒同時寫入
+
+用 pytest 執行: python -m pytest tests/ -v
+"""
+
+import json
+import threading
+import time
+
+import pytest
+
+from cache import DownloadCache
+
+
+@pytest.fixture
+def downloaded_file(tmp_path):
+    """一個實際存在的已下載檔案"""
+    path = tmp_path / "試題.pdf"
+    path.write_bytes(b"%PDF-1.4")
+    return str(path)
+
+
+def make_cache(tmp_path, flush_interval=60.0):
+    # 絕對路徑會取代 cache.py 所在目錄，快取檔寫在 tmp_path 內
+    return DownloadCache(str(tmp_path / "cache.json"), flush_interval=flush_interval)
+
+
+def read_cache_file(cache):
+    return json.loads(cache.cache_file.read_text(encoding="utf-8"))
+
+
+class TestDownloadCache:
+    """標記、存檔與重新載入"""
+
+    def test_mark_then_flush(self, tmp_path, downloaded_file):
+        """mark_downloaded 只標記 dirty，flush() 後才寫檔，重新載入可讀回"""
+        cache = make_cache(tmp_path)
+        cache.mark_downloaded("https://example.com/a", downloaded_file, 8, {"year": 114})
+        assert cache.is_downloaded("https://example.com/a", downloaded_file)
+        assert not cache.cache_file.exists()
+
+        cache.flush()
+        data = read_cache_file(cache)
+        assert len(data) == 1
+        entry = next(iter(data.values()))
+        assert entry["url"] == "https://example.com/a"
+        assert entry["metadata"] == {"year": 114}
+
+        reloaded = make_cache(tmp_path)
+        assert reloaded.is_downloaded("https://example.com/a", downloaded_file)
+
+    def test_timer_flush(self, tmp_path, downloaded_file):
+        """未呼叫 flush() 時，計時器到期也會寫出"""
+        cache = make_cache(tmp_path, flush_interval=0.05)
+        cache.mark_downloaded("https://example.com/a", downloaded_file, 8)
+
+        deadline = time.monotonic() + 5
+        while not cache.cache_file.exists() and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert len(read_cache_file(cache)) == 1
+
+    def test_concurrent_writers(self, tmp_path, downloaded_file):
+        """多執行緒同時標記，所有記錄都會寫出且不留暫存檔"""
+        cache = make_cache(tmp_path, flush_interval=0.01)
+        threads_n, per_thread = 8, 50
+
+        def worker(t):
+            for i in range(per_thread):
+                cache.mark_downloaded(f"https://example.com/{t}/{i}", downloaded_file, i)
+
+        threads = [threading.Thread(target=worker, args=(t,)) for t in range(threads_n)]
+        for th in threads:
+            th.start()
+        for th in threads:
+            th.join()
+        cache.flush()
+
+        assert len(read_cache_file(cache)) == threads_n * per_thread
+        assert cache.get_stats()["total_files"] == threads_n * per_thread
+        assert not list(tmp_path.glob("*.tmp"))
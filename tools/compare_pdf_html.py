@@ -13,11 +13,16 @@ PDF-HTML 全面比對系統
 
 import os
 import re
+import pickle
 import sys
 import argparse
+import functools
+import hashlib
+import string
 import unicodedata
 from pathlib import Path
 from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
 from difflib import SequenceMatcher
 
 try:
@@ -27,17 +32,51 @@ except ImportError:
     sys.exit(1)
 
 try:
-    from bs4 import BeautifulSoup
+    from lxml import etree
 except ImportError:
-    print("錯誤：需要 beautifulsoup4。請執行 pip install beautifulsoup4")
+    print("錯誤：需要 lxml。請執行 pip install lxml")
     sys.exit(1)
 
+# 選用：rapidfuzz 以 C++ 實作相似度與編輯操作，未安裝時退回 difflib
+try:
+    from rapidfuzz.distance import Levenshtein
+    from rapidfuzz.fuzz import ratio as _fuzz_ratio
+
+    def text_ratio(a: str, b: str) -> float:
+        """兩段文字的相似度 (0~1)"""
+        return _fuzz_ratio(a, b) / 100
+
+    def text_opcodes(a: str, b: str) -> list[tuple]:
+        """差異操作 (tag, i1, i2, j1, j2)，格式同 SequenceMatcher.get_opcodes"""
+        return Levenshtein.opcodes(a, b).as_list()
+except ImportError:
+    @functools.lru_cache(maxsize=2)
+    def _matcher(a: str, b: str) -> SequenceMatcher:
+        """同一組文字先算相似度再取差異時，共用已算好的 matching blocks
+
+        關閉 autojunk：長中文文字中常見字會被當成垃圾字元，相似度嚴重偏低，
+        與 rapidfuzz 的結果不一致，0.5 / 0.99 門檻的意義就會隨環境改變。
+        """
+        return SequenceMatcher(None, a, b, autojunk=False)
+
+    def text_ratio(a: str, b: str) -> float:
+        """兩段文字的相似度 (0~1)"""
+        return _matcher(a, b).ratio()
+
+    def text_opcodes(a: str, b: str) -> list[tuple]:
+        """差異操作 (tag, i1, i2, j1, j2)"""
+        return _matcher(a, b).get_opcodes()
+
 # ============================================================
 # 路徑與對應關係
 # ============================================================
 
 BASE_DIR = Path(r"C:\Users\User\Desktop\考古題下載\資管系考古題")
 HTML_FILE = BASE_DIR / "資管系考古題總覽.html"
+PDF_TEXT_CACHE_DIR = BASE_DIR / ".pdf_text_cache"
+HTML_CARDS_CACHE = BASE_DIR / ".html_cache.pkl"
+# 解析邏輯（_parse_card 等）變更時遞增，舊的卡片快取即失效
+HTML_PARSER_VERSION = 1
 
 # 科目代號 → 資料夾名稱的對應（某些年份的資料夾名稱和代號不同）
 # 注意：106年的警察情境實務和警察法規用了不同代號
@@ -70,10 +109,75 @@ SUBJECT_DISPLAY_NAME = {
 }
 
 
-def find_pdf_path(year: int, subject_code: str) -> Path | None:
-    """根據年份和科目代號找到 PDF 檔案路徑"""
+# ============================================================
+# 預先編譯的正則
+# ============================================================
+
+# 題號：數字. 或 數字、 或 數字) 開頭，直到下一題或大題標題
+_Q_PATTERN = re.compile(
+    r'(?:^|\n)\s*(\d{1,2})\s*[\.、）\)]\s*(.+?)(?=\n\s*\d{1,2}\s*[\.、）\)]|\n\s*[一二三四五六七八九十]+\s*[、\.．]|\Z)',
+    re.DOTALL
+)
+_OPT_PATTERN = re.compile(
+    r'[\(（]?\s*([A-Da-d])\s*[\)）]?\s*(.+?)(?=[\(（]?\s*[A-Da-d]\s*[\)）]|\Z)',
+    re.DOTALL
+)
+_DIGITS = re.compile(r'(\d+)')
+_WS = re.compile(r'\s+')
+_ENG_SEGMENT = re.compile(r'[A-Za-z][A-Za-z\s\',\.\-\(\)]{5,}')
+_CAMEL = re.compile(r'[a-z][A-Z]')
+_ASCII_LOWER = frozenset(string.ascii_lowercase)
+_COMMA_NO_SPACE = re.compile(r'[a-zA-Z],[a-zA-Z]')
+_PERIOD_NO_SPACE = re.compile(r'[a-z]\.[A-Z]')
+_EXAM_CODE = re.compile(r'\d{5}')
+_CARD_ID = re.compile(r'y(\d+)-(\d+)')
+
+# 常見的被拆開模式
+_SPLIT_RULES = (
+    (r'\b\w+\s+tion\b', 'tion 斷字'),
+    (r'\b\w+\s+sion\b', 'sion 斷字'),
+    (r'\b\w+\s+ment\b', 'ment 斷字'),
+    (r'\b\w+\s+ness\b', 'ness 斷字'),
+    (r'\b\w+\s+ance\b', 'ance 斷字'),
+    (r'\b\w+\s+ence\b', 'ence 斷字'),
+    (r'\b\w+\s+able\b', 'able 斷字'),
+    (r'\b\w+\s+ible\b', 'ible 斷字'),
+    (r'\bth\s+at\b', 'th at → that'),
+    (r'\bf\s+or\b', 'f or → for'),
+    (r'\bc\s+an\b', 'c an → can'),
+    (r'\bwh\s+at\b', 'wh at → what'),
+    (r'\bwh\s+en\b', 'wh en → when'),
+    (r'\bmin\s+or\b', 'min or → minor'),
+    (r'\bgr\s+and\b', 'gr and → grand'),
+    (r'\bsumm\s+on\b', 'summ on → summon'),
+    (r'\bhum\s+an\b', 'hum an → human'),
+    (r'\bmonit\s+or\b', 'monit or → monitor'),
+    (r'\bmilli\s+on\b', 'milli on → million'),
+    (r'\bsqu\s+are\b', 'squ are → square'),
+    (r'\bbe\s+at\b', 'be at → beat'),
+)
+# 合併成單一交替式，一次掃描即可；以群組名 g{i} 對應描述。
+# 每個規則包在 lookahead 內不消耗文字，不同起點的重疊命中（如 'f or ment'）都會回報
+_SPLIT_ALTERNATION = re.compile(
+    '|'.join(f'(?=(?P<g{i}>{pattern}))' for i, (pattern, _) in enumerate(_SPLIT_RULES)),
+    re.IGNORECASE
+)
+_SPLIT_DESCS = [desc for _, desc in _SPLIT_RULES]
+
+
+@functools.lru_cache(maxsize=None)
+def _year_folders(year: int) -> dict[str, Path]:
+    """列出某年份的科目資料夾 {資料夾名稱: 路徑}，每個年份只掃描一次"""
     year_dir = BASE_DIR / f"{year}年"
     if not year_dir.exists():
+        return {}
+    return {f.name: f for f in year_dir.iterdir() if f.is_dir()}
+
+
+def find_pdf_path(year: int, subject_code: str) -> Path | None:
+    """根據年份和科目代號找到 PDF 檔案路徑"""
+    folders = _year_folders(year)
+    if not folders:
         return None
 
     # 取得基本資料夾名稱
@@ -82,19 +186,17 @@ def find_pdf_path(year: int, subject_code: str) -> Path | None:
         return None
 
     # 嘗試直接匹配
-    for folder in year_dir.iterdir():
-        if folder.is_dir():
-            folder_name = folder.name
-            # 精確匹配或前綴匹配（處理括號差異）
-            if folder_name == base_name or folder_name.startswith(base_name):
-                pdf = folder / "試題.pdf"
-                if pdf.exists():
-                    return pdf
+    for folder_name, folder in folders.items():
+        # 精確匹配或前綴匹配（處理括號差異）
+        if folder_name == base_name or folder_name.startswith(base_name):
+            pdf = folder / "試題.pdf"
+            if pdf.exists():
+                return pdf
 
     # 模糊匹配：取前3個字做匹配
     prefix = base_name[:3]
-    for folder in year_dir.iterdir():
-        if folder.is_dir() and folder.name.startswith(prefix):
+    for folder_name, folder in folders.items():
+        if folder_name.startswith(prefix):
             pdf = folder / "試題.pdf"
             if pdf.exists():
                 return pdf
@@ -107,7 +209,49 @@ def find_pdf_path(year: int, subject_code: str) -> Path | None:
 # ============================================================
 
 def extract_pdf_text(pdf_path: Path) -> str:
-    """從 PDF 提取完整文字"""
+    """從 PDF 提取完整文字（依路徑、修改時間、大小快取到磁碟）"""
+    st = pdf_path.stat()
+    return _extract_pdf_text_cached(str(pdf_path), st.st_mtime_ns, st.st_size)
+
+
+def _pdf_text_cache_file(pdf_path: str, mtime_ns: int, size: int) -> Path:
+    """PDF 文字快取檔路徑，以路徑、修改時間、大小為鍵"""
+    key = hashlib.sha1(f"{pdf_path}:{mtime_ns}:{size}".encode()).hexdigest()
+    return PDF_TEXT_CACHE_DIR / f"{key}.txt"
+
+
+def read_cached_pdf_text(pdf_path: Path) -> str | None:
+    """只讀磁碟快取，未快取時回傳 None（不解析 PDF）"""
+    st = pdf_path.stat()
+    cache_file = _pdf_text_cache_file(str(pdf_path), st.st_mtime_ns, st.st_size)
+    try:
+        return cache_file.read_text(encoding="utf-8")
+    except OSError:
+        return None
+
+
+@functools.lru_cache(maxsize=256)
+def _extract_pdf_text_cached(pdf_path: str, mtime_ns: int, size: int) -> str:
+    """PDF 未變動時直接讀回上次提取的文字"""
+    cache_file = _pdf_text_cache_file(pdf_path, mtime_ns, size)
+    if cache_file.exists():
+        return cache_file.read_text(encoding="utf-8")
+
+    text = _extract_pdf_text_uncached(Path(pdf_path))
+    if not text.startswith("[PDF 讀取錯誤"):
+        # 先寫暫存檔再替換，行程被中斷時不會留下截斷的快取
+        tmp_file = cache_file.with_name(f"{cache_file.name}.{os.getpid()}.tmp")
+        try:
+            PDF_TEXT_CACHE_DIR.mkdir(exist_ok=True)
+            tmp_file.write_text(text, encoding="utf-8")
+            os.replace(tmp_file, cache_file)
+        except OSError:
+            pass  # 快取寫入失敗不影響比對
+    return text
+
+
+def _extract_pdf_text_uncached(pdf_path: Path) -> str:
+    """以 pdfplumber 逐頁提取文字"""
     text_parts = []
     try:
         with pdfplumber.open(pdf_path) as pdf:
@@ -131,24 +275,14 @@ def extract_pdf_questions(pdf_text: str) -> dict:
     # 合併所有文字為一個大字串，方便正則匹配
     full_text = "\n".join(lines)
 
-    # 匹配選擇題：數字. 或 數字、 或 Q數字 開頭
-    # 先嘗試找出所有題號位置
-    q_pattern = re.compile(
-        r'(?:^|\n)\s*(\d{1,2})\s*[\.、）\)]\s*(.+?)(?=\n\s*\d{1,2}\s*[\.、）\)]|\n\s*[一二三四五六七八九十]+\s*[、\.．]|\Z)',
-        re.DOTALL
-    )
-
-    for m in q_pattern.finditer(full_text):
+    # 匹配選擇題：先找出所有題號位置
+    for m in _Q_PATTERN.finditer(full_text):
         q_num = int(m.group(1))
         q_body = m.group(2).strip()
 
         # 從題目內容中分離選項
         opts = {}
-        opt_pattern = re.compile(
-            r'[\(（]?\s*([A-Da-d])\s*[\)）]?\s*(.+?)(?=[\(（]?\s*[A-Da-d]\s*[\)）]|\Z)',
-            re.DOTALL
-        )
-        opt_matches = list(opt_pattern.finditer(q_body))
+        opt_matches = list(_OPT_PATTERN.finditer(q_body))
 
         if opt_matches:
             stem = q_body[:opt_matches[0].start()].strip()
@@ -168,83 +302,130 @@ def extract_pdf_questions(pdf_text: str) -> dict:
 # HTML 文字提取
 # ============================================================
 
+def _has_class(cls: str) -> str:
+    """XPath 條件：class 屬性含有指定 token（同 BeautifulSoup 的 class_ 比對）"""
+    return f"contains(concat(' ', normalize-space(@class), ' '), ' {cls} ')"
+
+
+_X_H3 = etree.XPath(".//h3")
+_X_QUESTIONS = etree.XPath(f".//div[{_has_class('question')}]")
+_X_Q_NUM = etree.XPath(f".//span[{_has_class('q-num')}]")
+_X_Q_TEXT = etree.XPath(f".//span[{_has_class('q-text')}]")
+_X_OPTIONS = etree.XPath(f".//div[{_has_class('option')}]")
+_X_OPT_LABEL = etree.XPath(f".//span[{_has_class('opt-label')}]")
+_X_OPT_TEXT = etree.XPath(f".//span[{_has_class('opt-text')}]")
+_X_ESSAYS = etree.XPath(f".//div[{_has_class('essay-question')}]")
+_X_RAW_BLOCKS = [
+    etree.XPath(f".//div[{_has_class(cls)}]")
+    for cls in ("reading-passage", "exam-text", "exam-note")
+]
+
+
+def _text(elem) -> str:
+    """取得元素文字，等同 BeautifulSoup 的 get_text(strip=True)"""
+    return "".join(s.strip() for s in elem.itertext() if s.strip())
+
+
+def _first(xpath, elem):
+    """回傳 XPath 的第一個結果，沒有則 None"""
+    found = xpath(elem)
+    return found[0] if found else None
+
+
+def _parse_card(card) -> dict:
+    """從單張科目卡片元素提取標題、題目與完整文字"""
+    # 取得科目標題
+    h3 = _first(_X_H3, card)
+    title = _text(h3) if h3 is not None else ""
+
+    # 提取所有題目文字
+    questions = []
+    raw_texts = []
+
+    # 選擇題
+    for q_div in _X_QUESTIONS(card):
+        q_data = {}
+        # 題號
+        q_num_span = _first(_X_Q_NUM, q_div)
+        if q_num_span is not None:
+            num_match = _DIGITS.search(_text(q_num_span))
+            q_data["num"] = int(num_match.group(1)) if num_match else 0
+
+        # 題幹
+        q_text_span = _first(_X_Q_TEXT, q_div)
+        if q_text_span is not None:
+            q_data["stem"] = _text(q_text_span)
+            raw_texts.append(q_data["stem"])
+
+        # 選項
+        q_data["options"] = {}
+        for opt in _X_OPTIONS(q_div):
+            opt_label_span = _first(_X_OPT_LABEL, opt)
+            opt_text_span = _first(_X_OPT_TEXT, opt)
+            if opt_label_span is not None and opt_text_span is not None:
+                label = _text(opt_label_span).replace("(", "").replace(")", "").strip()
+                text = _text(opt_text_span)
+                q_data["options"][label] = text
+                raw_texts.append(text)
+
+        questions.append(q_data)
+
+    # 申論題
+    for essay in _X_ESSAYS(card):
+        text = _text(essay)
+        raw_texts.append(text)
+        questions.append({"type": "essay", "text": text})
+
+    # 閱讀測驗段落、exam-text (考試說明)、exam-note
+    for xpath in _X_RAW_BLOCKS:
+        for block in xpath(card):
+            raw_texts.append(_text(block))
+
+    return {
+        "title": title,
+        "questions": questions,
+        "raw_text": "\n".join(raw_texts),
+    }
+
+
 def parse_html_cards(html_path: Path) -> dict:
     """
     解析 HTML，提取每張科目卡片的內容。
+    HTML 未變動（路徑與修改時間相同）時直接讀回上次的解析結果。
     回傳: {"y{年}-{代號}": {"title": 科目名, "questions": [...], "raw_text": 完整文字}}
     """
-    with open(html_path, "r", encoding="utf-8") as f:
-        soup = BeautifulSoup(f.read(), "html.parser")
+    key = (HTML_PARSER_VERSION, str(html_path), html_path.stat().st_mtime_ns)
+    try:
+        data = pickle.loads(HTML_CARDS_CACHE.read_bytes())
+        if data["key"] == key:
+            return data["cards"]
+    except Exception:
+        pass  # 無快取、快取損毀或由較新的 Python 寫入，重新解析
+
+    cards = _parse_html_cards_uncached(html_path)
+    try:
+        HTML_CARDS_CACHE.write_bytes(pickle.dumps({"key": key, "cards": cards}, protocol=5))
+    except OSError:
+        pass  # 快取寫入失敗不影響比對
+    return cards
+
 
+def _parse_html_cards_uncached(html_path: Path) -> dict:
+    """以 iterparse 逐張讀取卡片，處理完即釋放，記憶體不隨檔案大小成長"""
     cards = {}
-    for card in soup.find_all("div", class_="subject-card"):
-        card_id = card.get("id", "")
-        if not card_id:
+    for _, elem in etree.iterparse(str(html_path), events=("end",), tag="div",
+                                   html=True, encoding="utf-8"):
+        if "subject-card" not in (elem.get("class") or "").split():
             continue
 
-        # 取得科目標題
-        h3 = card.find("h3")
-        title = h3.get_text(strip=True) if h3 else ""
-
-        # 提取所有題目文字
-        questions = []
-        raw_texts = []
-
-        # 選擇題
-        for q_div in card.find_all("div", class_="question"):
-            q_data = {}
-            # 題號
-            q_num_span = q_div.find("span", class_="q-num")
-            if q_num_span:
-                num_text = q_num_span.get_text(strip=True)
-                num_match = re.search(r'(\d+)', num_text)
-                q_data["num"] = int(num_match.group(1)) if num_match else 0
-
-            # 題幹
-            q_text_span = q_div.find("span", class_="q-text")
-            if q_text_span:
-                q_data["stem"] = q_text_span.get_text(strip=True)
-                raw_texts.append(q_data["stem"])
-
-            # 選項
-            q_data["options"] = {}
-            for opt in q_div.find_all("div", class_="option"):
-                opt_label_span = opt.find("span", class_="opt-label")
-                opt_text_span = opt.find("span", class_="opt-text")
-                if opt_label_span and opt_text_span:
-                    label = opt_label_span.get_text(strip=True).replace("(", "").replace(")", "").strip()
-                    text = opt_text_span.get_text(strip=True)
-                    q_data["options"][label] = text
-                    raw_texts.append(text)
-
-            questions.append(q_data)
-
-        # 申論題
-        for essay in card.find_all("div", class_="essay-question"):
-            text = essay.get_text(strip=True)
-            raw_texts.append(text)
-            questions.append({"type": "essay", "text": text})
-
-        # 閱讀測驗段落
-        for passage in card.find_all("div", class_="reading-passage"):
-            text = passage.get_text(strip=True)
-            raw_texts.append(text)
-
-        # exam-text (考試說明)
-        for et in card.find_all("div", class_="exam-text"):
-            text = et.get_text(strip=True)
-            raw_texts.append(text)
-
-        # exam-note
-        for en in card.find_all("div", class_="exam-note"):
-            text = en.get_text(strip=True)
-            raw_texts.append(text)
-
-        cards[card_id] = {
-            "title": title,
-            "questions": questions,
-            "raw_text": "\n".join(raw_texts),
-        }
+        card_id = elem.get("id", "")
+        if card_id:
+            cards[card_id] = _parse_card(elem)
+
+        # 釋放已處理的卡片與之前的兄弟節點
+        elem.clear()
+        while elem.getprevious() is not None:
+            del elem.getparent()[0]
 
     return cards
 
@@ -253,27 +434,39 @@ def parse_html_cards(html_path: Path) -> dict:
 # 文字正規化（用於比對）
 # ============================================================
 
+# 與正則 \s 相同的空白字元（即 str.isspace() 為真者）
+_WHITESPACE = (
+    '\t\n\x0b\x0c\r\x1c\x1d\x1e\x1f \x85\xa0\u1680'
+    '\u2000\u2001\u2002\u2003\u2004\u2005\u2006\u2007\u2008\u2009\u200a'
+    '\u2028\u2029\u202f\u205f\u3000'
+)
+
+# 刪除空白並統一標點，一次 translate 完成
+_NORMALIZE_TABLE = str.maketrans({
+    '，': ',', '。': '.', '；': ';',
+    '：': ':', '？': '?', '！': '!',
+    '（': '(', '）': ')',
+    '「': '"', '」': '"',
+    '『': '"', '』': '"',
+    '—': '-', '─': '-',
+    **dict.fromkeys(_WHITESPACE),
+})
+
+
+@functools.lru_cache(maxsize=8)
 def normalize_text(text: str) -> str:
-    """正規化文字以利比對：移除空白、標點差異等"""
+    """正規化文字以利比對：移除空白、標點差異等（同一段文字只正規化一次）"""
     # 統一全形/半形
     text = unicodedata.normalize("NFKC", text)
-    # 移除所有空白
-    text = re.sub(r'\s+', '', text)
-    # 統一標點
-    text = text.replace('，', ',').replace('。', '.').replace('；', ';')
-    text = text.replace('：', ':').replace('？', '?').replace('！', '!')
-    text = text.replace('（', '(').replace('）', ')')
-    text = text.replace('「', '"').replace('」', '"')
-    text = text.replace('『', '"').replace('』', '"')
-    text = text.replace('—', '-').replace('─', '-')
-    return text.lower()
+    # 移除所有空白、統一標點
+    return text.translate(_NORMALIZE_TABLE).lower()
 
 
 def normalize_for_english(text: str) -> str:
     """正規化英文文字：保留空白（用於偵測黏字/斷字）"""
     text = unicodedata.normalize("NFKC", text)
     # 合併連續空白為單一空白
-    text = re.sub(r'\s+', ' ', text).strip()
+    text = _WS.sub(' ', text).strip()
     return text
 
 
@@ -284,7 +477,7 @@ def normalize_for_english(text: str) -> str:
 def find_english_segments(text: str) -> list[str]:
     """從文字中提取所有連續英文片段"""
     # 匹配連續的英文字母+空白+標點序列
-    return re.findall(r'[A-Za-z][A-Za-z\s\',\.\-\(\)]{5,}', text)
+    return _ENG_SEGMENT.findall(text)
 
 
 def detect_glued_words(text: str) -> list[str]:
@@ -298,48 +491,22 @@ def detect_glued_words(text: str) -> list[str]:
         words = seg.split()
         for word in words:
             # 長度超過 15 且全小寫的英文字串很可能是黏字
-            if len(word) > 15 and word.isalpha() and word.islower():
+            # （片段只含 ASCII 字母與標點，集合比對等同 isalpha() and islower()）
+            if len(word) > 15 and _ASCII_LOWER.issuperset(word):
                 issues.append(f"可能黏字: '{word}'")
             # 小寫字母接大寫（非首字母）如 policeOfficers
-            if re.search(r'[a-z][A-Z]', word) and not word[0].isupper():
+            if not word[0].isupper() and _CAMEL.search(word):
                 issues.append(f"大小寫交界可能黏字: '{word}'")
     return issues
 
 
 def detect_split_words(text: str) -> list[str]:
     """偵測被拆開的英文單字"""
-    issues = []
-    # 常見的被拆開模式
-    split_patterns = [
-        (r'\b(\w+)\s+(tion)\b', 'tion 斷字'),
-        (r'\b(\w+)\s+(sion)\b', 'sion 斷字'),
-        (r'\b(\w+)\s+(ment)\b', 'ment 斷字'),
-        (r'\b(\w+)\s+(ness)\b', 'ness 斷字'),
-        (r'\b(\w+)\s+(ance)\b', 'ance 斷字'),
-        (r'\b(\w+)\s+(ence)\b', 'ence 斷字'),
-        (r'\b(\w+)\s+(able)\b', 'able 斷字'),
-        (r'\b(\w+)\s+(ible)\b', 'ible 斷字'),
-        (r'\bth\s+at\b', 'th at → that'),
-        (r'\bf\s+or\b', 'f or → for'),
-        (r'\bc\s+an\b', 'c an → can'),
-        (r'\bwh\s+at\b', 'wh at → what'),
-        (r'\bwh\s+en\b', 'wh en → when'),
-        (r'\bmin\s+or\b', 'min or → minor'),
-        (r'\bgr\s+and\b', 'gr and → grand'),
-        (r'\bsumm\s+on\b', 'summ on → summon'),
-        (r'\bhum\s+an\b', 'hum an → human'),
-        (r'\bmonit\s+or\b', 'monit or → monitor'),
-        (r'\bmilli\s+on\b', 'milli on → million'),
-        (r'\bsqu\s+are\b', 'squ are → square'),
-        (r'\bbe\s+at\b', 'be at → beat'),
+    return [
+        f"{_SPLIT_DESCS[int(m.lastgroup[1:])]}: '{m.group(m.lastgroup)}'"
+        for m in _SPLIT_ALTERNATION.finditer(text)
     ]
 
-    for pattern, desc in split_patterns:
-        for m in re.finditer(pattern, text, re.IGNORECASE):
-            issues.append(f"{desc}: '{m.group()}'")
-
-    return issues
-
 
 def compare_texts_detailed(pdf_text: str, html_text: str) -> list[dict]:
     """
@@ -355,32 +522,28 @@ def compare_texts_detailed(pdf_text: str, html_text: str) -> list[dict]:
         return []  # 文字完全相同，無問題
 
     # 2. 找出差異的位置
-    matcher = SequenceMatcher(None, norm_pdf, norm_html)
-    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
-        if tag != 'equal':
-            pdf_segment = norm_pdf[max(0, i1-20):i2+20]
-            html_segment = norm_html[max(0, j1-20):j2+20]
-
-            if tag == 'replace':
-                issues.append({
-                    "type": "替換",
-                    "pdf": norm_pdf[i1:i2],
-                    "html": norm_html[j1:j2],
-                    "pdf_context": pdf_segment,
-                    "html_context": html_segment,
-                })
-            elif tag == 'delete':
-                issues.append({
-                    "type": "PDF 有但 HTML 缺少",
-                    "pdf": norm_pdf[i1:i2],
-                    "pdf_context": pdf_segment,
-                })
-            elif tag == 'insert':
-                issues.append({
-                    "type": "HTML 多出",
-                    "html": norm_html[j1:j2],
-                    "html_context": html_segment,
-                })
+    for tag, i1, i2, j1, j2 in text_opcodes(norm_pdf, norm_html):
+        # 上下文只在該類型需要時才切片
+        if tag == 'replace':
+            issues.append({
+                "type": "替換",
+                "pdf": norm_pdf[i1:i2],
+                "html": norm_html[j1:j2],
+                "pdf_context": norm_pdf[max(0, i1-20):i2+20],
+                "html_context": norm_html[max(0, j1-20):j2+20],
+            })
+        elif tag == 'delete':
+            issues.append({
+                "type": "PDF 有但 HTML 缺少",
+                "pdf": norm_pdf[i1:i2],
+                "pdf_context": norm_pdf[max(0, i1-20):i2+20],
+            })
+        elif tag == 'insert':
+            issues.append({
+                "type": "HTML 多出",
+                "html": norm_html[j1:j2],
+                "html_context": norm_html[max(0, j1-20):j2+20],
+            })
 
     return issues
 
@@ -454,7 +617,7 @@ def check_english_spacing(html_text: str) -> list[dict]:
     issues = []
 
     # 英文句子中逗號後沒有空格
-    for m in re.finditer(r'[a-zA-Z],[a-zA-Z]', html_text):
+    for m in _COMMA_NO_SPACE.finditer(html_text):
         context_start = max(0, m.start() - 20)
         context_end = min(len(html_text), m.end() + 20)
         issues.append({
@@ -464,7 +627,7 @@ def check_english_spacing(html_text: str) -> list[dict]:
         })
 
     # 英文句子中句號後沒有空格（排除小數點和縮寫）
-    for m in re.finditer(r'[a-z]\.[A-Z]', html_text):
+    for m in _PERIOD_NO_SPACE.finditer(html_text):
         context_start = max(0, m.start() - 20)
         context_end = min(len(html_text), m.end() + 20)
         issues.append({
@@ -479,7 +642,7 @@ def check_english_spacing(html_text: str) -> list[dict]:
 def deep_compare_with_pdf(pdf_text: str, html_text: str, subject_name: str) -> list[dict]:
     """
     深度比對：將 PDF 文字和 HTML 文字都拆成 token，
-    用 SequenceMatcher 找出具體差異。
+    用編輯操作找出具體差異。
     """
     issues = []
 
@@ -491,8 +654,18 @@ def deep_compare_with_pdf(pdf_text: str, html_text: str, subject_name: str) -> l
     if len(norm_pdf) < 10 or len(norm_html) < 10:
         return issues
 
+    # 相似度 2M/(len_a+len_b) 的上限為 2*短/(短+長)，長度差太多就不必算
+    lo, hi = sorted((len(norm_pdf), len(norm_html)))
+    ratio_bound = 2 * lo / (lo + hi)
+    if ratio_bound < 0.5:
+        issues.append({
+            "type": "警告",
+            "detail": f"PDF 與 HTML 文字相似度極低 (長度比上限 {ratio_bound:.2%})，可能結構不對應",
+        })
+        return issues
+
     # 計算相似度
-    ratio = SequenceMatcher(None, norm_pdf, norm_html).ratio()
+    ratio = text_ratio(norm_pdf, norm_html)
 
     if ratio < 0.5:
         # 如果相似度太低，可能是完全不同的內容，跳過
@@ -505,36 +678,30 @@ def deep_compare_with_pdf(pdf_text: str, html_text: str, subject_name: str) -> l
     if ratio > 0.99:
         return issues  # 幾乎完全相同
 
-    # 找出有差異的地方
-    matcher = SequenceMatcher(None, norm_pdf, norm_html)
-    diff_count = 0
-    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
-        if tag != 'equal' and (i2 - i1 > 1 or j2 - j1 > 1):
-            pdf_diff = norm_pdf[i1:i2]
-            html_diff = norm_html[j1:j2]
-
-            # 過濾掉考卷代號等無意義差異
-            if re.match(r'^\d{5}$', pdf_diff) or re.match(r'^\d{5}$', html_diff):
-                continue
-
-            # 提供上下文
-            ctx_start_p = max(0, i1 - 15)
-            ctx_end_p = min(len(norm_pdf), i2 + 15)
-            ctx_start_h = max(0, j1 - 15)
-            ctx_end_h = min(len(norm_html), j2 + 15)
+    # 找出有差異的地方：先只留 (tag, i1, i2, j1, j2)，最後才為保留的差異建 dict
+    raw_ops = []
+    for tag, i1, i2, j1, j2 in text_opcodes(norm_pdf, norm_html):
+        if tag == 'equal' or (i2 - i1 <= 1 and j2 - j1 <= 1):
+            continue
+        # 過濾掉考卷代號等無意義差異（以 pos/endpos 比對，不必先切片）
+        if _EXAM_CODE.fullmatch(norm_pdf, i1, i2) or _EXAM_CODE.fullmatch(norm_html, j1, j2):
+            continue
+        raw_ops.append((tag, i1, i2, j1, j2))
+        if len(raw_ops) > 50:
+            break
 
-            issues.append({
-                "type": tag,
-                "pdf_text": pdf_diff[:80],
-                "html_text": html_diff[:80],
-                "pdf_context": norm_pdf[ctx_start_p:ctx_end_p],
-                "html_context": norm_html[ctx_start_h:ctx_end_h],
-            })
-            diff_count += 1
+    for tag, i1, i2, j1, j2 in raw_ops:
+        # 報告只取前 80 字，並提供上下文
+        issues.append({
+            "type": tag,
+            "pdf_text": norm_pdf[i1:min(i2, i1 + 80)],
+            "html_text": norm_html[j1:min(j2, j1 + 80)],
+            "pdf_context": norm_pdf[max(0, i1 - 15):min(len(norm_pdf), i2 + 15)],
+            "html_context": norm_html[max(0, j1 - 15):min(len(norm_html), j2 + 15)],
+        })
 
-            if diff_count > 50:
-                issues.append({"type": "警告", "detail": "差異過多（>50），僅顯示前50個"})
-                break
+    if len(raw_ops) > 50:
+        issues.append({"type": "警告", "detail": "差異過多（>50），僅顯示前50個"})
 
     return issues
 
@@ -562,10 +729,11 @@ def run_comparison(year_filter=None, subject_filter=None):
     total_pdfs_ok = 0
     all_issues = []
 
-    # 遍歷所有卡片
+    # 先找出所有要比對的卡片與 PDF
+    targets = []
     for card_id, card_data in sorted(html_cards.items()):
         # 解析 card_id: y{年}-{代號}
-        m = re.match(r'y(\d+)-(\d+)', card_id)
+        m = _CARD_ID.match(card_id)
         if not m:
             continue
         year = int(m.group(1))
@@ -585,12 +753,31 @@ def run_comparison(year_filter=None, subject_filter=None):
             print(f"[!] {year}年 {subject_name} ({code}): 找不到 PDF")
             continue
 
+        targets.append((year, code, subject_name, pdf_path, card_data))
+
+    # 先在主行程讀磁碟快取；只有未快取的 PDF 才需要解析
+    pdf_paths = [t[3] for t in targets]
+    pdf_texts = [read_cached_pdf_text(p) for p in pdf_paths]
+    misses = [i for i, text in enumerate(pdf_texts) if text is None]
+
+    # PDF 解析為 CPU 密集且彼此獨立，多個未快取時以多行程平行提取
+    # （Windows 以 spawn 啟動行程，每個 worker 都要重新載入 pdfplumber，少量時不值得）
+    if len(misses) > 1:
+        workers = min(os.cpu_count() or 1, len(misses))
+        with ProcessPoolExecutor(max_workers=workers) as ex:
+            extracted = ex.map(extract_pdf_text, [pdf_paths[i] for i in misses])
+            for i, text in zip(misses, extracted):
+                pdf_texts[i] = text
+    else:
+        for i in misses:
+            pdf_texts[i] = extract_pdf_text(pdf_paths[i])
+
+    # 遍歷所有卡片
+    for (year, code, subject_name, pdf_path, card_data), pdf_text in zip(targets, pdf_texts):
         total_pdfs += 1
         print(f"--- {year}年 {subject_name} ({code}) ---")
         print(f"    PDF: {pdf_path.name}")
 
-        # 提取 PDF 文字
-        pdf_text = extract_pdf_text(pdf_path)
         if pdf_text.startswith("[PDF 讀取錯誤"):
             print(f"    {pdf_text}")
             continue
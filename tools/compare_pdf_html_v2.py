@@ -26,9 +26,15 @@ try:
 except ImportError:
     print("錯誤：需要 pdfplumber"); sys.exit(1)
 try:
-    from bs4 import BeautifulSoup
+    from bs4 import BeautifulSoup, SoupStrainer
 except ImportError:
     print("錯誤：需要 beautifulsoup4"); sys.exit(1)
+# 選用：rapidfuzz（C++ 實作），未安裝時退回 difflib
+try:
+    from rapidfuzz import fuzz
+    from rapidfuzz.distance import Levenshtein
+except ImportError:
+    fuzz = Levenshtein = None
 
 # ============================================================
 # 路徑
@@ -120,8 +126,10 @@ def parse_html(html_path: Path) -> dict:
     解析 HTML，回傳 {card_id: {title, mc_questions, essays, full_text}}
     mc_questions = [{num, stem, options: {A:..., B:...}, stem_raw, options_raw}]
     """
+    # 只建構科目卡片的子樹，略過頁面其他部分
+    strainer = SoupStrainer("div", class_="subject-card")
     with open(html_path, "r", encoding="utf-8") as f:
-        soup = BeautifulSoup(f.read(), "html.parser")
+        soup = BeautifulSoup(f.read(), "lxml", parse_only=strainer)
 
     cards = {}
     for card in soup.find_all("div", class_="subject-card"):
@@ -200,15 +208,29 @@ def norm(text: str) -> str:
     return t.lower()
 
 
-def similarity(a: str, b: str) -> float:
-    return SequenceMatcher(None, a, b).ratio()
+def similarity(a: str, b: str, cutoff: float = 0.0) -> float:
+    """相似度 (0~1)；低於 cutoff 時直接回傳 0，不做完整比對"""
+    if fuzz is not None:
+        return fuzz.ratio(a, b, score_cutoff=cutoff * 100) / 100
+    # 關閉 autojunk，否則長中文文字的相似度嚴重偏低，與 rapidfuzz 的結果不一致
+    matcher = SequenceMatcher(None, a, b, autojunk=False)
+    # 先用便宜的上限值篩掉不可能達標的組合
+    if matcher.real_quick_ratio() < cutoff or matcher.quick_ratio() < cutoff:
+        return 0.0
+    return matcher.ratio()
+
+
+def opcodes(a: str, b: str) -> list[tuple]:
+    """差異操作 (tag, i1, i2, j1, j2)，格式同 SequenceMatcher.get_opcodes"""
+    if Levenshtein is not None:
+        return Levenshtein.opcodes(a, b).as_list()
+    return SequenceMatcher(None, a, b, autojunk=False).get_opcodes()
 
 
 def find_diffs(a: str, b: str) -> list[dict]:
     """找出 a 與 b 之間的具體差異"""
     diffs = []
-    matcher = SequenceMatcher(None, a, b)
-    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+    for tag, i1, i2, j1, j2 in opcodes(a, b):
         if tag == 'equal':
             continue
         a_seg = a[i1:i2]
@@ -381,7 +403,7 @@ def compare_question_level(pdf_questions: dict, html_questions: list) -> list[di
         n_pdf = norm(pdf_q)
         n_html = norm(hq["full_text"])
 
-        sim = similarity(n_pdf, n_html)
+        sim = similarity(n_pdf, n_html, cutoff=0.3)
 
         if sim > 0.95:
             continue  # 幾乎一致，跳過